@@ -0,0 +1,592 @@
+from types import MappingProxyType
+from ParseTree import *
+
+# Node types whose attribute values are always memoized, so that after an edit
+# only the changed statements, subroutine and class are evaluated again
+BOUNDARY_TYPES = ('class', 'subroutine', 'subroutineBody', 'statements')
+
+
+class Attribute():
+
+    def __init__(self, name, combine=None, leaf=None, depends=()):
+        """
+        A synthesized attribute: a value computed for each node from the same attribute of its children
+        @param name The attribute's name
+        @param combine Binary function folding child values at nodes without a rule of their own,
+                       with leaf as its identity, or None to give those nodes None
+        @param leaf The value of tokens, and the identity of combine
+        @param depends Attributes this one's rules read through evaluator.get, computed first in the same pass
+        """
+        self.name = name
+        self.combine = combine
+        self.leaf = leaf
+        self.depends = list(depends)
+        self.rules = {}
+
+
+    def rule(self, *node_types):
+        """
+        Decorator registering the rule that computes this attribute for the given node types.
+        A rule is called as rule(evaluator, node, values), where values holds this attribute
+        for each of the node's children, in order. Values are shared between nodes and
+        returned to callers, so they should be immutable (frozenset, tuple, MappingProxyType).
+        @param node_types The node types the rule applies to
+        """
+        def register(function):
+            for node_type in node_types:
+                self.rules[node_type] = function
+            return function
+        return register
+
+
+def withDependencies(attributes):
+    """
+    Order attributes so each comes after the attributes it depends on
+    @param attributes A list of Attributes
+    @return A list of those Attributes and their dependencies, dependencies first
+    """
+    ordered = []
+    visiting = []
+
+    def visit(attribute):
+        if attribute in ordered:
+            return
+        if attribute in visiting:
+            raise ValueError(f"Attribute {attribute.name} depends on itself")
+        visiting.append(attribute)
+        for dependency in attribute.depends:
+            visit(dependency)
+        visiting.pop()
+        ordered.append(attribute)
+
+    for attribute in attributes:
+        visit(attribute)
+    return ordered
+
+
+class AttributeEvaluator():
+
+    def __init__(self, tree, boundaries=BOUNDARY_TYPES):
+        """
+        Evaluates and memoizes attributes over a ParseTree.
+
+        Values are memoized at boundary nodes and at the nodes evaluate is called on;
+        elsewhere they only live on the evaluation stack. Tokens are never memoized, so
+        they may be shared between trees, but other nodes must appear once in the tree.
+        Change the tree through replaceChild, or call invalidate on each node whose
+        children were changed in place (or clear after a whole-tree rewrite such as
+        ExpressionOptimizer.optimize), otherwise stale values will be returned.
+        @param tree The root of the ParseTree
+        @param boundaries Node types whose values are always memoized
+        """
+        self.tree = tree
+        self.boundaries = frozenset(boundaries)
+        # node -> {attribute: value}, for memoized nodes only; ParseTrees hash by identity
+        self.cache = {}
+        # memoized node -> nearest memoized ancestor (None at the top)
+        self.parents = {}
+        # The node whose rules are running, and its values computed so far, for get()
+        self.active = None
+        self.active_row = None
+        self.active_index = None
+
+
+    def evaluate(self, attributes, node=None):
+        """
+        Compute several attributes, and the attributes they depend on, in a single
+        post-order traversal, reusing memoized values. Memoized subtrees whose
+        attributes are all cached are not visited again.
+        @param attributes A list of Attributes
+        @param node The subtree to evaluate, or None for the whole tree
+        @return A dict mapping each requested attribute's name to its value at the node
+        """
+        if node is None:
+            node = self.tree
+        if not node.children:
+            return {attribute.name: attribute.leaf for attribute in attributes}
+
+        needed = withDependencies(attributes)
+        index = {attribute: i for i, attribute in enumerate(needed)}
+        leaf_row = tuple(attribute.leaf for attribute in needed)
+        # Row of a node without rules whose children are all tokens, shared so it can be skipped by identity
+        empty_row = tuple(attribute.leaf if attribute.combine is not None else None for attribute in needed)
+        passthrough = all(attribute.combine is not None for attribute in needed)
+        cache = self.cache
+        parents = self.parents
+        # node type -> (((attribute index, rule), ...), memoize?, attributes folded by combine)
+        plans = {}
+
+        # Pre-order visiting the last child first, so that reversed it is a left-to-right
+        # post-order. Memoized subtrees are replaced by their cached row. A None on the
+        # stack marks the end of a boundary node's subtree. The loops read
+        # node_type/children directly as they run once per node.
+        order = []
+        counts = []
+        anchors = [parents.get(node)]
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current is None:
+                anchors.pop()
+                continue
+            plan = plans.get(current.node_type)
+            if plan is None:
+                plan = plans[current.node_type] = self.plan(needed, current.node_type)
+            if plan[1]:
+                parents[current] = anchors[-1]
+                memo = cache.get(current)
+                if memo is not None:
+                    for attribute in needed:
+                        if attribute not in memo:
+                            break
+                    else:
+                        order.append(tuple(memo[attribute] for attribute in needed))
+                        counts.append(-1)
+                        continue
+                anchors.append(current)
+                stack.append(None)
+            internal = 0
+            for child in current.children:
+                if child.children:
+                    stack.append(child)
+                    internal += 1
+            order.append(current)
+            counts.append(internal)
+
+        # Each node pops its non-token children's rows off a single stack of rows,
+        # holding one value per attribute, and pushes its own
+        rows = []
+        self.active_index = index
+        for current, internal in zip(reversed(order), reversed(counts)):
+            if internal < 0:
+                rows.append(current)
+                continue
+            rules, memoize, folds = plans[current.node_type]
+
+            if not rules:
+                # A node without rules combines its children's rows; a single child's
+                # row passes through untouched, staying on the stack
+                if internal == 0:
+                    rows.append(empty_row)
+                elif internal == 1:
+                    if not passthrough and rows[-1] is not empty_row:
+                        rows[-1] = self.fold(folds, needed, [rows[-1]], empty_row)
+                else:
+                    child_rows = rows[-internal:]
+                    del rows[-internal:]
+                    rows.append(self.fold(folds, needed, child_rows, empty_row))
+                if memoize:
+                    self.memoize(current, needed, rows[-1])
+                continue
+
+            children = current.children
+            if internal:
+                child_rows = rows[-internal:]
+                del rows[-internal:]
+                row = list(self.fold(folds, needed, child_rows, empty_row))
+                remaining = iter(child_rows)
+                full_rows = [next(remaining) if child.children else leaf_row for child in children]
+            else:
+                row = list(empty_row)
+                full_rows = [leaf_row] * len(children)
+            self.active = current
+            self.active_row = row
+            for i, function in rules:
+                row[i] = function(self, current, [child_row[i] for child_row in full_rows])
+            row = tuple(row)
+            if row == empty_row:
+                row = empty_row
+            if memoize:
+                self.memoize(current, needed, row)
+            rows.append(row)
+        self.active = self.active_row = self.active_index = None
+
+        row = rows[-1]
+        if node not in cache:
+            self.memoize(node, needed, row)
+        return {attribute.name: row[index[attribute]] for attribute in attributes}
+
+
+    def plan(self, needed, node_type):
+        """
+        Work out how to evaluate attributes at nodes of one type
+        @param needed The Attributes being evaluated
+        @param node_type The node type
+        @return A tuple (((index, rule), ...) for attributes with a rule, True if a boundary,
+                ((index, combine, leaf), ...) for attributes folded with combine)
+        """
+        rules = tuple((i, attribute.rules[node_type]) for i, attribute in enumerate(needed)
+                      if node_type in attribute.rules)
+        folds = tuple((i, attribute.combine, attribute.leaf) for i, attribute in enumerate(needed)
+                      if node_type not in attribute.rules and attribute.combine is not None)
+        return rules, node_type in self.boundaries, folds
+
+
+    def fold(self, folds, needed, child_rows, empty_row):
+        """
+        Combine children's rows for the attributes without a rule at a node
+        @param folds ((index, combine, leaf), ...) for the attributes folded with combine
+        @param needed The Attributes being evaluated
+        @param child_rows The rows of the node's non-token children
+        @param empty_row The row of a node with nothing to combine
+        @return The node's row; attributes that are neither folded nor computed by a rule are None
+        """
+        present = [child_row for child_row in child_rows if child_row is not empty_row]
+        if not present:
+            return empty_row
+        row = [None] * len(needed)
+        for i, combine, leaf in folds:
+            value = leaf
+            for child_row in present:
+                child_value = child_row[i]
+                if child_value is not leaf:
+                    value = child_value if value is leaf else combine(value, child_value)
+            row[i] = value
+        return tuple(row)
+
+
+    def memoize(self, node, needed, row):
+        """
+        Remember a node's values
+        @param node The ParseTree node
+        @param needed The Attributes evaluated
+        @param row The node's values, in the order of needed
+        """
+        memo = self.cache.get(node)
+        if memo is None:
+            self.cache[node] = dict(zip(needed, row))
+        else:
+            memo.update(zip(needed, row))
+
+
+    def get(self, node, attribute):
+        """
+        Get one attribute of a node, computing it if it isn't memoized.
+        Rules can use this to read attributes they depend on.
+        @param node The ParseTree node
+        @param attribute The Attribute
+        @return The attribute's value
+        """
+        if node is self.active and attribute in self.active_index:
+            return self.active_row[self.active_index[attribute]]
+        values = self.cache.get(node)
+        if values is not None and attribute in values:
+            return values[attribute]
+        active = self.active, self.active_row, self.active_index
+        try:
+            return self.evaluate([attribute], node)[attribute.name]
+        finally:
+            self.active, self.active_row, self.active_index = active
+
+
+    def invalidate(self, node):
+        """
+        Forget the memoized attributes of a node and its ancestors.
+        Call this after changing a node's children in place.
+        @param node The changed ParseTree node
+        """
+        if node not in self.parents:
+            # Not memoized, so its ancestors aren't linked: find them from the root
+            for ancestor in self.path(node):
+                self.cache.pop(ancestor, None)
+            return
+        while node is not None:
+            self.cache.pop(node, None)
+            node = self.parents.get(node)
+
+
+    def path(self, node):
+        """
+        Find the nodes from the root of the tree down to a node
+        @param node The ParseTree node
+        @return The list of nodes on the path, or an empty list if the node isn't in the tree
+        """
+        found = {self.tree: None}
+        pending = [self.tree]
+        while pending:
+            current = pending.pop()
+            if current is node:
+                result = []
+                while current is not None:
+                    result.append(current)
+                    current = found[current]
+                return result
+            for child in current.getChildren():
+                if child.getChildren():
+                    found[child] = current
+                    pending.append(child)
+        return []
+
+
+    def replaceChild(self, parent, index, child):
+        """
+        Replace a subtree, forgetting everything memoized for the old subtree and the parent's ancestors
+        @param parent The ParseTree node whose child is replaced
+        @param index The position of the child to replace
+        @param child The new subtree
+        """
+        children = parent.getChildren()
+        pending = [children[index]]
+        while pending:
+            node = pending.pop()
+            self.cache.pop(node, None)
+            self.parents.pop(node, None)
+            pending.extend(node.getChildren())
+
+        self.invalidate(parent)
+        children[index] = child
+
+
+    def clear(self):
+        """
+        Forget everything memoized, e.g. after the tree was rewritten in place
+        """
+        self.cache.clear()
+        self.parents.clear()
+
+
+NO_CALLS = frozenset()
+NO_ENTRIES = MappingProxyType({})
+
+
+def mergeMappings(first, second):
+    """
+    Combine two mappings into one read-only mapping
+    @param first A mapping
+    @param second A mapping, whose entries win over first's
+    @return The merged MappingProxyType
+    """
+    return MappingProxyType({**first, **second})
+
+
+def mergeAll(evaluator, node, values):
+    """
+    Rule combining child mappings into one read-only mapping
+    """
+    result = {}
+    for value in values:
+        if value:
+            result.update(value)
+    return MappingProxyType(result)
+
+
+def subroutineName(subroutine):
+    """
+    Get the name of a subroutine node
+    @param subroutine The subroutine ParseTree
+    @return The subroutine's name
+    """
+    return subroutine.getChildren()[2].getValue()
+
+
+# Type of each expression and term: 'int', 'boolean', 'String', 'null',
+# or None where it depends on declarations (variables, calls, this).
+EXPRESSION_TYPE = Attribute('expressionType')
+
+@EXPRESSION_TYPE.rule('term')
+def termType(evaluator, node, values):
+    """
+    Rule giving the type of a term
+    """
+    children = node.getChildren()
+    first = children[0] if children else None
+    if first is None:
+        return None
+    if first.getType() == 'integerConstant':
+        return 'int'
+    if first.getType() == 'stringConstant':
+        return 'String'
+    if first.getType() == 'keyword':
+        return {'true': 'boolean', 'false': 'boolean', 'null': 'null'}.get(first.getValue())
+    if first.getType() == 'symbol' and first.getValue() == '(':
+        return values[1]
+    if first.getType() == 'symbol' and first.getValue() == '-':
+        return 'int'
+    if first.getType() == 'symbol' and first.getValue() == '~':
+        return values[1]
+    return None
+
+@EXPRESSION_TYPE.rule('expression')
+def expressionType(evaluator, node, values):
+    """
+    Rule giving the type of an expression, evaluated left to right
+    """
+    children = node.getChildren()
+    if not children or children[0].getType() != 'term':
+        return None
+    result = values[0]
+    for i in range(1, len(children) - 1, 2):
+        op = children[i].getValue()
+        if op in ['<', '>', '=']:
+            result = 'boolean'
+        elif op in ['&', '|']:
+            result = result if result == values[i + 1] else 'int'
+        else:
+            result = 'int'
+    return result
+
+
+
+
+# Names of the subroutines called within each subtree, as 'name' or 'target.name'
+CALLS = Attribute('calls', frozenset.union, NO_CALLS)
+
+@CALLS.rule('term')
+def termCalls(evaluator, node, values):
+    """
+    Rule adding the subroutine a term calls, if any
+    """
+    result = NO_CALLS
+    for value in values:
+        if value:
+            result = result | value if result else value
+    children = node.getChildren()
+    if len(children) > 1 and children[0].getType() == 'identifier':
+        if children[1].getValue() == '(':
+            result = result | {children[0].getValue()}
+        elif children[1].getValue() == '.':
+            result = result | {children[0].getValue() + '.' + children[2].getValue()}
+    return result
+
+
+# Call graph: subroutine name -> names of the subroutines it calls
+CALL_GRAPH = Attribute('callGraph', mergeMappings, NO_ENTRIES, [CALLS])
+CALL_GRAPH.rule('class')(mergeAll)
+
+@CALL_GRAPH.rule('subroutine')
+def subroutineCalls(evaluator, node, values):
+    """
+    Rule mapping a subroutine to its calls
+    """
+    return MappingProxyType({subroutineName(node): evaluator.get(node, CALLS)})
+
+
+# Number of branch points (if and while statements) within each subtree
+DECISIONS = Attribute('decisions', int.__add__, 0)
+
+@DECISIONS.rule('ifStatement', 'whileStatement')
+def branchDecisions(evaluator, node, values):
+    """
+    Rule counting an if or while statement as a branch point
+    """
+    return 1 + sum(values)
+
+
+# Cyclomatic complexity: subroutine name -> branch points + 1
+COMPLEXITY = Attribute('complexity', mergeMappings, NO_ENTRIES, [DECISIONS])
+COMPLEXITY.rule('class')(mergeAll)
+
+@COMPLEXITY.rule('subroutine')
+def subroutineComplexity(evaluator, node, values):
+    """
+    Rule mapping a subroutine to its cyclomatic complexity
+    """
+    return MappingProxyType({subroutineName(node): evaluator.get(node, DECISIONS) + 1})
+
+
+if __name__ == "__main__":
+    import timeit
+    from CompilerParser import CompilerParser
+
+    def tokenize(words):
+        """
+        Build tokens from a list of "type:value" strings
+        """
+        return [Token(*word.split(':', 1)) for word in words]
+
+    """
+    Tokens for:
+        class Main {
+            function int f ( ) {
+                if ( 1 < 2 ) { do g ( ) ; }
+                return 1 ;
+            }
+            function void g ( ) {
+                do Output . print ( "a" ) ;
+                return ;
+            }
+        }
+    """
+    words = ("keyword:class identifier:Main symbol:{ "
+             "keyword:function keyword:int identifier:f symbol:( symbol:) symbol:{ "
+             "keyword:if symbol:( integerConstant:1 symbol:< integerConstant:2 symbol:) symbol:{ "
+             "keyword:do identifier:g symbol:( symbol:) symbol:; symbol:} "
+             "keyword:return integerConstant:1 symbol:; symbol:} "
+             "keyword:function keyword:void identifier:g symbol:( symbol:) symbol:{ "
+             "keyword:do identifier:Output symbol:. identifier:print symbol:( stringConstant:a symbol:) symbol:; "
+             "keyword:return symbol:; symbol:} "
+             "symbol:}").split()
+    tree = CompilerParser(tokenize(words)).compileProgram()
+
+    # Both analyses in one traversal; CALLS and DECISIONS are pulled in as dependencies
+    evaluator = AttributeEvaluator(tree)
+    result = evaluator.evaluate([COMPLEXITY, CALL_GRAPH])
+    expected = {'complexity': {'f': 2, 'g': 1}, 'callGraph': {'f': {'g'}, 'g': {'Output.print'}}}
+    if result != expected:
+        raise Exception(f"Analyses gave {result}, expected {expected}")
+
+    # Replace f's if statement with a plain do statement; only its ancestors are recomputed
+    statements = tree.getChildren()[3].getChildren()[6].getChildren()[1]
+    replacement = CompilerParser(tokenize("keyword:do identifier:h symbol:( symbol:) symbol:;".split())).compileDo()
+    evaluator.replaceChild(statements, 0, replacement)
+    result = evaluator.evaluate([COMPLEXITY, CALL_GRAPH])
+    expected = {'complexity': {'f': 1, 'g': 1}, 'callGraph': {'f': {'h'}, 'g': {'Output.print'}}}
+    if result != expected:
+        raise Exception(f"Analyses after replaceChild gave {result}, expected {expected}")
+    print("Analyses and invalidation gave the expected results")
+
+    # Benchmark: the fused pass against plain recursive walks, one per analysis per subroutine
+    def walkCalls(node):
+        calls = set()
+        children = node.getChildren()
+        if node.getType() == 'term' and len(children) > 1 and children[0].getType() == 'identifier':
+            if children[1].getValue() == '(':
+                calls.add(children[0].getValue())
+            elif children[1].getValue() == '.':
+                calls.add(children[0].getValue() + '.' + children[2].getValue())
+        for child in children:
+            calls |= walkCalls(child)
+        return calls
+
+    def walkDecisions(node):
+        count = 1 if node.getType() in ['ifStatement', 'whileStatement'] else 0
+        for child in node.getChildren():
+            count += walkDecisions(child)
+        return count
+
+    def byHand(tree):
+        subroutines = [child for child in tree.getChildren() if child.getType() == 'subroutine']
+        return {'complexity': {subroutineName(node): walkDecisions(node) + 1 for node in subroutines},
+                'callGraph': {subroutineName(node): walkCalls(node) for node in subroutines}}
+
+    member = ("keyword:function keyword:int identifier:f{0} symbol:( keyword:int identifier:x symbol:) symbol:{{ "
+              "keyword:var keyword:int identifier:i symbol:; "
+              "keyword:let identifier:i symbol:= integerConstant:1 symbol:+ symbol:( identifier:x symbol:* integerConstant:2 symbol:) symbol:; "
+              "keyword:if symbol:( symbol:~ identifier:b symbol:) symbol:{{ "
+              "keyword:do identifier:p symbol:. identifier:move symbol:( identifier:x symbol:, identifier:a symbol:[ identifier:i symbol:] symbol:) symbol:; symbol:}} "
+              "keyword:else symbol:{{ keyword:do identifier:f{1} symbol:( symbol:) symbol:; symbol:}} "
+              "keyword:while symbol:( identifier:i symbol:< integerConstant:10 symbol:) symbol:{{ "
+              "keyword:let identifier:i symbol:= identifier:i symbol:+ integerConstant:1 symbol:; symbol:}} "
+              "keyword:return identifier:i symbol:; symbol:}} ")
+    words = "keyword:class identifier:Main symbol:{ " + "".join(member.format(i, i + 1) for i in range(300)) + "symbol:}"
+    tokens = tokenize(words.split())
+    tree = CompilerParser(tokens).compileProgram()
+
+    fused = lambda: AttributeEvaluator(tree).evaluate([COMPLEXITY, CALL_GRAPH])
+    if fused() != byHand(tree):
+        raise Exception("Fused pass and recursive walks disagree")
+    # Best of several runs, so a busy machine doesn't fail the comparison
+    fused_time = min(timeit.repeat(fused, number=5, repeat=5)) / 5
+    hand_time = min(timeit.repeat(lambda: byHand(tree), number=5, repeat=5)) / 5
+    print(f"{len(tokens)} tokens: fused pass {fused_time * 1000:.1f} ms, recursive walks {hand_time * 1000:.1f} ms")
+    if fused_time > 1.5 * hand_time:
+        raise Exception("Fused pass is not competitive with the recursive walks")
+
+    # Values handed out are read-only, so callers can't corrupt shared defaults or memoized values
+    result = AttributeEvaluator(tree).evaluate([CALL_GRAPH])['callGraph']
+    try:
+        result['f0'] = NO_CALLS
+    except TypeError:
+        pass
+    else:
+        raise Exception("Evaluated mappings can be modified")
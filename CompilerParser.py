@@ -22,7 +22,7 @@ class CompilerParser :
         if self.have('keyword', 'class'):
             return self.compileClass()
         else:
-            raise ParseException("The program doesn't begin with keyword class")
+            raise ParseException("The program doesn't begin with keyword class", self.current())
     
     
     def compileClass(self):
@@ -31,7 +31,7 @@ class CompilerParser :
         @return a ParseTree that represents a class
         """
         if not self.have('keyword', 'class'):
-            raise ParseException("The class declaration doesn't begin with a class")
+            raise ParseException("The class declaration doesn't begin with a class", self.current())
     
         tree = ParseTree('class', '')
         # class keyword
@@ -45,7 +45,7 @@ class CompilerParser :
         tree.addChild(self.mustBe("symbol", "{"))
 
         # classVarDec
-        while self.have('keyword', 'static'):
+        while self.have('keyword', ['static', 'field']):
             VarDec = self.compileClassVarDec()
             tree.addChild(VarDec)
 
@@ -73,7 +73,7 @@ class CompilerParser :
         elif self.have('keyword', 'field'):
             tree.addChild(self.mustBe('keyword', 'field'))
         else:
-            raise ParseException("Class variable declaration must begin with 'static' or 'field'")
+            raise ParseException("Class variable declaration must begin with 'static' or 'field'", self.current())
         
         # type
         classVar_type = self.current().getValue()
@@ -110,7 +110,7 @@ class CompilerParser :
         if sub_dec in ['constructor', 'method', 'function']:
             tree.addChild(self.mustBe('keyword', sub_dec))
         else:
-            raise ParseException("The subroutine doesn't start with constructor, function or method")
+            raise ParseException("The subroutine doesn't start with constructor, function or method", self.current())
         
         # subroutine type
         sub_type = self.current().getValue()
@@ -526,7 +526,8 @@ class CompilerParser :
         if self.current_token < len(self.tokens):
             return self.tokens[self.current_token]
         else:
-            raise ParseException("No more token to parse!")
+            # Point at the last token, where the input ran out
+            raise ParseException("No more token to parse!", self.tokens[-1] if self.tokens else None)
 
 
     def have(self,expectedType,expectedValue):
@@ -554,7 +555,7 @@ class CompilerParser :
             self.next()
             return current
         else:
-            raise ParseException(f"Expected {expectedType}:{expectedValue}, got {current.getType()}:{current.getValue()}")
+            raise ParseException(f"Expected {expectedType}:{expectedValue}, got {current.getType()}:{current.getValue()}", current)
     
 
 if __name__ == "__main__":
@@ -0,0 +1,338 @@
+from ParseTree import *
+
+# Binary operators whose result is a boolean (true is -1, false is 0)
+COMPARISONS = ['<', '>', '=']
+
+# op -> right operand values that leave the left-hand value unchanged
+RIGHT_IDENTITIES = {'+': [0], '-': [0], '*': [1], '/': [1], '|': [0], '&': [-1]}
+
+# op -> left operand values that leave the right-hand value unchanged
+LEFT_IDENTITIES = {'+': [0], '*': [1], '|': [0], '&': [-1]}
+
+# op -> operand values that make the result that value whatever the other operand is
+ANNIHILATORS = {'*': [0], '&': [0], '|': [-1]}
+
+
+def wrap(value):
+    """
+    Wrap an integer to Jack's signed 16-bit range
+    @param value The integer to wrap
+    @return The value as a two's complement 16-bit integer
+    """
+    value &= 0xFFFF
+    if value >= 0x8000:
+        value -= 0x10000
+    return value
+
+
+def applyBinary(op, left, right):
+    """
+    Evaluate a binary operator using Jack's 16-bit semantics
+    @param op The operator symbol
+    @param left The left operand value
+    @param right The right operand value
+    @return The result, or None if it can't be folded (e.g. division by zero)
+    """
+    if op == '+':
+        return wrap(left + right)
+    if op == '-':
+        return wrap(left - right)
+    if op == '*':
+        return wrap(left * right)
+    if op == '/':
+        if right == 0:
+            return None
+        quotient = abs(left) // abs(right)
+        return wrap(quotient if (left < 0) == (right < 0) else -quotient)
+    if op == '&':
+        return left & right
+    if op == '|':
+        return left | right
+    if op == '<':
+        return -1 if left < right else 0
+    if op == '>':
+        return -1 if left > right else 0
+    if op == '=':
+        return -1 if left == right else 0
+    return None
+
+
+def countNodes(tree):
+    """
+    Count the nodes in a ParseTree
+    @param tree The ParseTree to count
+    @return The number of nodes, including the root
+    """
+    count = 0
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        count += 1
+        pending.extend(node.getChildren())
+    return count
+
+
+def isPure(tree):
+    """
+    Check if evaluating a ParseTree can't have side effects, i.e. it makes no subroutine calls
+    @param tree The ParseTree to check
+    @return True if pure, False otherwise
+    """
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if node.getType() == 'expressionList':
+            return False
+        pending.extend(node.getChildren())
+    return True
+
+
+class ExpressionOptimizer():
+
+    def __init__(self):
+        """
+        Folds constants and simplifies expression/term subtrees of a ParseTree in place
+        """
+        self.removed = 0
+
+
+    def optimize(self, tree):
+        """
+        Optimize every expression in a ParseTree
+        @param tree The ParseTree to optimize
+        @return The optimized ParseTree
+        """
+        before = countNodes(tree)
+        if tree.getType() == 'expression':
+            self.optimizeExpression(tree)
+        elif tree.getType() == 'term':
+            tree = self.optimizeTerm(tree)
+        else:
+            pending = [tree]
+            while pending:
+                node = pending.pop()
+                for child in node.getChildren():
+                    if child.getType() == 'expression':
+                        self.optimizeExpression(child)
+                    else:
+                        pending.append(child)
+        self.removed += before - countNodes(tree)
+        return tree
+
+
+    def optimizeExpression(self, tree):
+        """
+        Fold constants and apply algebraic identities in an expression.
+        Jack evaluates `term (op term)*` left to right, so the running value is
+        always the whole prefix to the left of the current operator.
+        @param tree The expression ParseTree, modified in place
+        """
+        children = tree.getChildren()
+        if not children or children[0].getType() != 'term':
+            return
+
+        first = self.optimizeTerm(children[0])
+        result = [first]
+        value = self.constantValue(first)
+
+        for i in range(1, len(children) - 1, 2):
+            op = children[i]
+            term = self.optimizeTerm(children[i + 1])
+            operand = self.constantValue(term)
+            symbol = op.getValue()
+
+            if value is not None and operand is not None:
+                folded = applyBinary(symbol, value[0], operand[0])
+                is_bool = symbol in COMPARISONS or (symbol in ['&', '|'] and value[1] and operand[1])
+                constant = self.makeConstant(folded, is_bool) if folded is not None else None
+                if constant is not None:
+                    result = [constant]
+                    value = (folded, is_bool)
+                    continue
+            elif operand is not None and operand[0] in RIGHT_IDENTITIES.get(symbol, []):
+                continue
+            elif value is not None and len(result) == 1 and value[0] in LEFT_IDENTITIES.get(symbol, []):
+                result = [term]
+                value = None
+                continue
+            elif operand is not None and operand[0] in ANNIHILATORS.get(symbol, []) and all(isPure(node) for node in result):
+                result = [term]
+                value = operand
+                continue
+            elif value is not None and len(result) == 1 and value[0] in ANNIHILATORS.get(symbol, []) and isPure(term):
+                continue
+
+            result.append(op)
+            result.append(term)
+            value = None
+
+        # An expression that is just a parenthesized expression takes its contents
+        if len(result) == 1:
+            inner = self.parenthesized(result[0])
+            if inner is not None:
+                result = list(inner.getChildren())
+
+        tree.children = result
+
+
+    def optimizeTerm(self, tree):
+        """
+        Simplify a term: fold unary operators, collapse `~~x` and `-(-x)`, and drop redundant parentheses
+        @param tree The term ParseTree
+        @return The simplified term, which may be a different node
+        """
+        children = tree.getChildren()
+        if not children:
+            return tree
+
+        first = children[0]
+        if first.getType() == 'symbol' and first.getValue() == '(':
+            self.optimizeExpression(children[1])
+            inner = children[1].getChildren()
+            # Parentheses around a single term never change its meaning
+            if len(inner) == 1 and inner[0].getType() == 'term':
+                return inner[0]
+            return tree
+
+        if first.getType() == 'symbol' and first.getValue() in ['-', '~']:
+            operand = self.optimizeTerm(children[1])
+            value = self.constantValue(operand)
+            if value is not None:
+                if first.getValue() == '-':
+                    folded, is_bool = wrap(-value[0]), False
+                else:
+                    folded, is_bool = wrap(~value[0]), value[1]
+                constant = self.makeConstant(folded, is_bool)
+                if constant is not None:
+                    return constant
+            # ~~x and -(-x) are both x
+            nested = operand.getChildren()
+            if len(nested) == 2 and nested[0].getType() == 'symbol' and nested[0].getValue() == first.getValue():
+                return nested[1]
+            tree.children = [first, operand]
+            return tree
+
+        for child in children:
+            if child.getType() == 'expression':
+                self.optimizeExpression(child)
+            elif child.getType() == 'expressionList':
+                for expression in child.getChildren():
+                    if expression.getType() == 'expression':
+                        self.optimizeExpression(expression)
+        return tree
+
+
+    def parenthesized(self, term):
+        """
+        Get the expression inside a parenthesized term
+        @param term The term ParseTree
+        @return The inner expression, or None if the term isn't `( expression )`
+        """
+        children = term.getChildren()
+        if len(children) == 3 and children[0].getType() == 'symbol' and children[0].getValue() == '(':
+            return children[1]
+        return None
+
+
+    def constantValue(self, term):
+        """
+        Get the value of a constant term
+        @param term The term ParseTree
+        @return A pair (16-bit value, True if boolean), or None if the term isn't constant
+        """
+        children = term.getChildren()
+        if len(children) == 1:
+            leaf = children[0]
+            if leaf.getType() == 'integerConstant':
+                return (wrap(int(leaf.getValue())), False)
+            if leaf.getType() == 'keyword' and leaf.getValue() == 'true':
+                return (-1, True)
+            if leaf.getType() == 'keyword' and leaf.getValue() == 'false':
+                return (0, True)
+        elif len(children) == 2 and children[0].getType() == 'symbol' and children[0].getValue() == '-':
+            operand = children[1].getChildren()
+            if len(operand) == 1 and operand[0].getType() == 'integerConstant':
+                return (wrap(-int(operand[0].getValue())), False)
+        return None
+
+
+    def makeConstant(self, value, is_bool):
+        """
+        Build a term for a constant value
+        @param value The 16-bit value
+        @param is_bool True if the value is a boolean
+        @return The term ParseTree, or None if the value has no literal form
+        """
+        tree = ParseTree('term', '')
+        if is_bool and value in [0, -1]:
+            tree.addChild(Token('keyword', 'true' if value == -1 else 'false'))
+        elif value >= 0:
+            tree.addChild(Token('integerConstant', str(value)))
+        elif value > -32768:
+            # Negative numbers are written as a unary minus on a literal
+            literal = ParseTree('term', '')
+            literal.addChild(Token('integerConstant', str(-value)))
+            tree.addChild(Token('symbol', '-'))
+            tree.addChild(literal)
+        else:
+            # -32768 has no positive counterpart to negate
+            return None
+        return tree
+
+
+if __name__ == "__main__":
+    from CompilerParser import CompilerParser
+
+    def optimizeWords(words):
+        """
+        Parse an expression from "type:value" strings and optimize it
+        @return A pair (the optimized expression's leaves joined by spaces, nodes removed)
+        """
+        tokens = [Token(*word.split(':', 1)) for word in words.split()]
+        optimizer = ExpressionOptimizer()
+        expression = optimizer.optimize(CompilerParser(tokens).compileExpression())
+        leaves = []
+        pending = [expression]
+        while pending:
+            node = pending.pop()
+            if node.getChildren():
+                pending.extend(reversed(node.getChildren()))
+            elif node.getValue():
+                leaves.append(node.getValue())
+        return ' '.join(leaves), optimizer.removed
+
+    # (expression, expected result, expected nodes removed)
+    cases = [
+        # 1 + (2 * 3) - ~~x + -(-y) * 1
+        ("integerConstant:1 symbol:+ symbol:( integerConstant:2 symbol:* integerConstant:3 symbol:) "
+         "symbol:- symbol:~ symbol:~ identifier:x symbol:+ symbol:- symbol:( symbol:- identifier:y symbol:) "
+         "symbol:* integerConstant:1", "7 - x + y", 25),
+        # Jack has no precedence: 1 + 2 * 3 is (1 + 2) * 3
+        ("integerConstant:1 symbol:+ integerConstant:2 symbol:* integerConstant:3", "9", 6),
+        # -32768 has no literal form, so overflowing into it is left alone
+        ("integerConstant:32767 symbol:+ integerConstant:1", "32767 + 1", 0),
+        ("integerConstant:256 symbol:* integerConstant:128", "256 * 128", 0),
+        ("symbol:- integerConstant:32767 symbol:- integerConstant:1", "- 32767 - 1", 0),
+        # Other results wrap to 16 bits
+        ("integerConstant:256 symbol:* integerConstant:256", "0", 3),
+        ("integerConstant:0 symbol:- integerConstant:1", "- 1", 1),
+        # Division truncates toward zero and is never folded by zero
+        ("integerConstant:7 symbol:/ symbol:- integerConstant:2", "- 3", 3),
+        ("symbol:- integerConstant:7 symbol:/ integerConstant:2", "- 3", 3),
+        ("integerConstant:7 symbol:/ integerConstant:0", "7 / 0", 0),
+        # Comparisons and bitwise operators on booleans give booleans
+        ("integerConstant:1 symbol:< integerConstant:2 symbol:& keyword:true", "true", 6),
+        ("symbol:~ keyword:false", "true", 2),
+        # Identities
+        ("integerConstant:0 symbol:+ identifier:x symbol:+ integerConstant:0", "x", 6),
+        ("identifier:x symbol:* integerConstant:1 symbol:/ integerConstant:1", "x", 6),
+        # Annihilators only drop operands without subroutine calls
+        ("identifier:x symbol:* integerConstant:0", "0", 3),
+        ("identifier:f symbol:( symbol:) symbol:* integerConstant:0", "f ( ) * 0", 0),
+        ("integerConstant:0 symbol:& identifier:a symbol:. identifier:g symbol:( symbol:)", "0 & a . g ( )", 0),
+    ]
+    for words, expected, removed in cases:
+        result = optimizeWords(words)
+        if result != (expected, removed):
+            raise Exception(f"Optimizing {words} gave {result}, expected {(expected, removed)}")
+    print(f"{len(cases)} expressions optimized as expected")
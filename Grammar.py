@@ -0,0 +1,280 @@
+class GrammarException(Exception):
+    """
+    Raised when a grammar spec is malformed or is not LL(1)
+    Use this with `raise GrammarException("My error message")`
+    """
+    pass
+
+
+# Marker used as the lookahead once all tokens have been consumed
+END = ('$', None)
+
+# Token types whose values are not part of the grammar (any value matches)
+WILDCARD_TYPES = ('identifier', 'integerConstant', 'stringConstant')
+
+
+def kw(*values):
+    """
+    Build one single-terminal production per keyword value
+    @param values The keyword values
+    @return A list of productions
+    """
+    return [[('keyword', value)] for value in values]
+
+
+def sym(*values):
+    """
+    Build one single-terminal production per symbol value
+    @param values The symbol values
+    @return A list of productions
+    """
+    return [[('symbol', value)] for value in values]
+
+
+IDENTIFIER = ('identifier', None)
+
+
+# Declarative spec of the Jack grammar accepted by CompilerParser.
+#
+# Each nonterminal maps to a list of productions, each production being a list of
+# symbols. A terminal is a (type, value) tuple, where a value of None matches any
+# token of that type. A nonterminal is a string. An empty production is epsilon.
+#
+# Only nonterminals listed in JACK_NODE_TYPES produce a ParseTree node; all others
+# are helpers whose symbols are added straight to the enclosing node, matching the
+# flat layout produced by the compile* methods.
+JACK_GRAMMAR = {
+    'class': [[('keyword', 'class'), IDENTIFIER, ('symbol', '{'),
+               '_classVarDecs', '_subroutineDecs', ('symbol', '}')]],
+    '_classVarDecs': [['classVarDec', '_classVarDecs'], []],
+    '_subroutineDecs': [['subroutine', '_subroutineDecs'], []],
+
+    'classVarDec': [['_classVarKind', '_type', IDENTIFIER, '_moreVarNames', ('symbol', ';')]],
+    '_classVarKind': kw('static', 'field'),
+    '_type': kw('int', 'char', 'boolean') + [[IDENTIFIER]],
+    '_moreVarNames': [[('symbol', ','), IDENTIFIER, '_moreVarNames'], []],
+
+    'subroutine': [['_subroutineKind', '_returnType', IDENTIFIER, ('symbol', '('),
+                    'parameterList', ('symbol', ')'), 'subroutineBody']],
+    '_subroutineKind': kw('constructor', 'function', 'method'),
+    '_returnType': kw('void') + [['_type']],
+    'parameterList': [['_type', IDENTIFIER, '_moreParameters'], []],
+    '_moreParameters': [[('symbol', ','), '_type', IDENTIFIER, '_moreParameters'], []],
+
+    'subroutineBody': [[('symbol', '{'), '_varDecs', 'statements', ('symbol', '}')]],
+    '_varDecs': [['varDec', '_varDecs'], []],
+    'varDec': [[('keyword', 'var'), '_type', IDENTIFIER, '_moreVarNames', ('symbol', ';')]],
+
+    'statements': [['_statementSeq']],
+    '_statementSeq': [['_statement', '_statementSeq'], []],
+    '_statement': [['letStatement'], ['ifStatement'], ['whileStatement'],
+                   ['doStatement'], ['returnStatement']],
+
+    'letStatement': [[('keyword', 'let'), IDENTIFIER, '_letIndex', ('symbol', '='),
+                      '_letValue', ('symbol', ';')]],
+    '_letIndex': [[('symbol', '['), 'expression', ('symbol', ']')], []],
+    '_letValue': kw('skip') + [['_nonSkipExpression']],
+    'ifStatement': [[('keyword', 'if'), ('symbol', '('), 'expression', ('symbol', ')'),
+                     ('symbol', '{'), 'statements', ('symbol', '}'), '_elseClause']],
+    '_elseClause': [[('keyword', 'else'), ('symbol', '{'), 'statements', ('symbol', '}')], []],
+    'whileStatement': [[('keyword', 'while'), ('symbol', '('), 'expression', ('symbol', ')'),
+                        ('symbol', '{'), 'statements', ('symbol', '}')]],
+    'doStatement': [[('keyword', 'do'), 'expression', ('symbol', ';')]],
+    'returnStatement': [[('keyword', 'return'), '_returnValue', ('symbol', ';')]],
+    '_returnValue': [['expression'], []],
+
+    'expression': kw('skip') + [['term', '_opTerms']],
+    '_nonSkipExpression': [['term', '_opTerms']],
+    '_opTerms': [['_op', 'term', '_opTerms'], []],
+    '_op': sym('+', '-', '*', '/', '&', '|', '<', '>', '='),
+
+    'term': [[('integerConstant', None)],
+             [('stringConstant', None)],
+             [('keyword', 'true')], [('keyword', 'false')],
+             [('keyword', 'null')], [('keyword', 'this')],
+             [('symbol', '('), 'expression', ('symbol', ')')],
+             [('symbol', '-'), 'term'],
+             [('symbol', '~'), 'term'],
+             [IDENTIFIER, '_termSuffix']],
+    '_termSuffix': [[('symbol', '['), 'expression', ('symbol', ']')],
+                    [('symbol', '('), 'expressionList', ('symbol', ')')],
+                    [('symbol', '.'), IDENTIFIER, ('symbol', '('), 'expressionList', ('symbol', ')')],
+                    []],
+    'expressionList': [['expression', '_moreExpressions'], []],
+    '_moreExpressions': [[('symbol', ','), 'expression', '_moreExpressions'], []],
+}
+
+JACK_NODE_TYPES = {
+    'class': 'class',
+    'classVarDec': 'classVarDec',
+    'subroutine': 'subroutine',
+    'parameterList': 'parameterList',
+    'subroutineBody': 'subroutineBody',
+    'varDec': 'varDec',
+    'statements': 'statements',
+    'letStatement': 'letStatement',
+    'ifStatement': 'ifStatement',
+    'whileStatement': 'whileStatement',
+    'doStatement': 'doStatement',
+    'returnStatement': 'returnStatement',
+    'expression': 'expression',
+    '_nonSkipExpression': 'expression',
+    'term': 'term',
+    'expressionList': 'expressionList',
+}
+
+
+class Grammar():
+
+    def __init__(self, rules, start, node_types):
+        """
+        An LL(1) grammar with its FIRST/FOLLOW sets and parse table
+        @param rules A dict mapping each nonterminal to its list of productions
+        @param start The start nonterminal
+        @param node_types A dict mapping node-producing nonterminals to their ParseTree node type
+        """
+        if start not in rules:
+            raise GrammarException(f"Start symbol {start} has no productions")
+        for name, productions in rules.items():
+            for production in productions:
+                for symbol in production:
+                    if isinstance(symbol, str) and symbol not in rules:
+                        raise GrammarException(f"Undefined nonterminal {symbol} used in {name}")
+
+        self.rules = rules
+        self.start = start
+        self.node_types = node_types
+        self.first = self.computeFirst()
+        self.follow = self.computeFollow(start)
+        self.table = self.computeTable(self.follow)
+        self.actions = self.computeActions(self.table)
+
+        # Each node-producing nonterminal can be parsed on its own, as the start of the
+        # augmented grammar S' -> A $; those tables only add end-of-input entries
+        self.entry_actions = {start: self.actions}
+        for name in node_types:
+            if name != start:
+                self.entry_actions[name] = self.computeActions(self.computeTable(self.computeFollow(name)))
+
+        # Stack actions of the production through which each nullable nonterminal derives epsilon
+        self.epsilon_actions = {}
+        for name, productions in rules.items():
+            for production in productions:
+                if self.firstOfSequence(production)[1]:
+                    self.epsilon_actions[name] = self.stackEntries(name, production)
+
+
+    def firstOfSequence(self, symbols):
+        """
+        Get the FIRST set of a sequence of symbols
+        @param symbols A list of grammar symbols
+        @return A pair (set of terminals, True if the whole sequence can derive epsilon)
+        """
+        result = set()
+        for symbol in symbols:
+            if isinstance(symbol, str):
+                result |= self.first[symbol]
+                if symbol not in self.nullable:
+                    return result, False
+            else:
+                result.add(symbol)
+                return result, False
+        return result, True
+
+
+    def computeFirst(self):
+        """
+        Compute the FIRST set of every nonterminal by fixpoint iteration
+        @return A dict mapping each nonterminal to its set of terminals
+        """
+        self.first = {name: set() for name in self.rules}
+        self.nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, productions in self.rules.items():
+                for production in productions:
+                    terminals, nullable = self.firstOfSequence(production)
+                    if not terminals <= self.first[name]:
+                        self.first[name] |= terminals
+                        changed = True
+                    if nullable and name not in self.nullable:
+                        self.nullable.add(name)
+                        changed = True
+        return self.first
+
+
+    def computeFollow(self, start):
+        """
+        Compute the FOLLOW set of every nonterminal by fixpoint iteration
+        @param start The nonterminal followed by the end of input
+        @return A dict mapping each nonterminal to its set of terminals
+        """
+        follow = {name: set() for name in self.rules}
+        follow[start].add(END)
+        changed = True
+        while changed:
+            changed = False
+            for name, productions in self.rules.items():
+                for production in productions:
+                    for i, symbol in enumerate(production):
+                        if not isinstance(symbol, str):
+                            continue
+                        terminals, nullable = self.firstOfSequence(production[i + 1:])
+                        if nullable:
+                            terminals = terminals | follow[name]
+                        if not terminals <= follow[symbol]:
+                            follow[symbol] |= terminals
+                            changed = True
+        return follow
+
+
+    def computeTable(self, follow):
+        """
+        Build the LL(1) parse table
+        @param follow The FOLLOW sets to use for epsilon productions
+        @return A dict mapping each nonterminal to a dict of lookahead terminal -> production
+        """
+        table = {name: {} for name in self.rules}
+        for name, productions in self.rules.items():
+            for production in productions:
+                terminals, nullable = self.firstOfSequence(production)
+                if nullable:
+                    terminals = terminals | follow[name]
+                for terminal in terminals:
+                    existing = table[name].get(terminal)
+                    if existing is not None and existing is not production:
+                        raise GrammarException(f"Grammar is not LL(1): {name} has two productions for {terminal[0]}:{terminal[1]}")
+                    table[name][terminal] = production
+        return table
+
+
+    def computeActions(self, table):
+        """
+        Turn a parse table into stack actions, reversed so they can be pushed as-is
+        @param table The parse table
+        @return A dict mapping each nonterminal to a dict of lookahead terminal -> tuple of stack entries
+        """
+        actions = {}
+        for name, row in table.items():
+            actions[name] = {}
+            for terminal, production in row.items():
+                actions[name][terminal] = self.stackEntries(name, production)
+        return actions
+
+
+    def stackEntries(self, name, production):
+        """
+        Get the stack entries that expand a nonterminal with one of its productions
+        @param name The nonterminal
+        @param production The production
+        @return A tuple of symbols in reverse order, preceded by None if the nonterminal produces a node
+        """
+        entries = list(reversed(production))
+        if name in self.node_types:
+            # None closes the node opened when this nonterminal was expanded
+            entries.insert(0, None)
+        return tuple(entries)
+
+
+JACK = Grammar(JACK_GRAMMAR, 'class', JACK_NODE_TYPES)
@@ -1,9 +1,105 @@
+from bisect import bisect_right
+
+
 class ParseException(Exception):
     """
     Raised when tokens provided don't match the expected grammar
-    Use this with `raise ParseException("My error message")`
+    Use this with `raise ParseException("My error message")`,
+    or `raise ParseException("My error message", token)` to record where the error is
     """
-    pass
+
+    def __init__(self, message, token=None):
+        """
+        @param message The error message
+        @param token The offending token, if known
+        """
+        super().__init__(message)
+        self.message = message
+        self.token = token
+
+
+    @property
+    def offset(self):
+        """
+        The character offset of the offending token, or None if unknown
+        """
+        return self.token.getOffset() if self.token is not None else None
+
+
+    @property
+    def source(self):
+        """
+        The name of the file containing the offending token, or None if unknown
+        """
+        if self.token is None or self.token.getSource() is None:
+            return None
+        return self.token.getSource().getName()
+
+
+    @property
+    def line(self):
+        """
+        The 1-based line of the offending token, or None if unknown
+        """
+        return self.token.getLocation()[0] if self.token is not None else None
+
+
+    @property
+    def column(self):
+        """
+        The 1-based column of the offending token, or None if unknown
+        """
+        return self.token.getLocation()[1] if self.token is not None else None
+
+
+    def __str__(self):
+        """
+        Generate the error message, prefixed with the location when it is known
+        @return The message as "name:line:column: message"
+        """
+        if self.token is None:
+            return self.message
+        line, column = self.token.getLocation()
+        if line is None:
+            return self.message
+        return f"{self.source}:{line}:{column}: {self.message}"
+
+
+class SourceFile():
+
+    def __init__(self, name, text):
+        """
+        A source file that tokens can point into by character offset
+        @param name The file name used in error messages
+        @param text The file contents
+        """
+        self.name = name
+        self.text = text
+
+        # Offset at which each line begins, so a position is one bisect away
+        self.line_starts = [0]
+        newline = text.find('\n')
+        while newline != -1:
+            self.line_starts.append(newline + 1)
+            newline = text.find('\n', newline + 1)
+
+
+    def getName(self):
+        """
+        Get the name of this file
+        @return The file name
+        """
+        return self.name
+
+
+    def getLocation(self, offset):
+        """
+        Convert a character offset into a line and column
+        @param offset The character offset into the file
+        @return A pair (line, column), both 1-based
+        """
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
 
 
 class ParseTree():
@@ -83,5 +179,62 @@ class Token(ParseTree):
     """
     Token for parsing. Can be used as a terminal node in a ParseTree
     """
-    pass
+
+    def __init__(self, node_type, value, offset=None, source=None):
+        """
+        A token, optionally remembering where it came from
+        @param node_type The type of token (see element types).
+        @param value The token's text.
+        @param offset The character offset of the token in its source file.
+        @param source The SourceFile the token was read from.
+        """
+        super().__init__(node_type, value)
+        self.offset = offset
+        self.source = source
+        self.location = None
+
+
+    def getOffset(self):
+        """
+        Get the character offset of this token in its source file
+        @return The offset, or None if unknown
+        """
+        return self.offset
+
+
+    def getSource(self):
+        """
+        Get the file this token was read from
+        @return The SourceFile, or None if unknown
+        """
+        return self.source
+
+
+    def getLocation(self):
+        """
+        Get the line and column this token starts at.
+        Computed from the file's line index on first use, then remembered.
+        @return A pair (line, column), both 1-based, or (None, None) if unknown
+        """
+        if self.location is None:
+            if self.offset is None or self.source is None:
+                return None, None
+            self.location = self.source.getLocation(self.offset)
+        return self.location
+
+
+    def getLine(self):
+        """
+        Get the line this token starts on
+        @return The 1-based line, or None if unknown
+        """
+        return self.getLocation()[0]
+
+
+    def getColumn(self):
+        """
+        Get the column this token starts at
+        @return The 1-based column, or None if unknown
+        """
+        return self.getLocation()[1]
     
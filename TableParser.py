@@ -0,0 +1,401 @@
+from ParseTree import *
+from Grammar import *
+
+class TableParser :
+
+    def __init__(self,tokens,grammar=JACK):
+        """
+        Constructor for the TableParser, a table-driven alternative to CompilerParser
+        @param tokens A list of tokens to be parsed
+        @param grammar The LL(1) Grammar to parse with
+        """
+        self.tokens = tokens
+        self.current_token = 0
+        self.grammar = grammar
+
+
+    def compileProgram(self):
+        """
+        Generates a parse tree for a single program
+        @return a ParseTree that represents the program
+        """
+        if not self.tokens:
+            raise ParseException("No tokens to parse")
+
+        if not self.have('keyword', 'class'):
+            raise ParseException("The program doesn't begin with keyword class", self.current())
+
+        return self.parse(self.grammar.start)
+
+
+    def compileClass(self):
+        """
+        Generates a parse tree for a class
+        @return a ParseTree that represents a class
+        """
+        return self.parse('class')
+
+
+    def compileClassVarDec(self):
+        """
+        Generates a parse tree for a static variable declaration or field declaration
+        @return a ParseTree that represents a static variable declaration or field declaration
+        """
+        return self.parse('classVarDec')
+
+
+    def compileSubroutine(self):
+        """
+        Generates a parse tree for a method, function, or constructor
+        @return a ParseTree that represents a method, function, or constructor
+        """
+        return self.parse('subroutine')
+
+
+    def compileParameterList(self):
+        """
+        Generates a parse tree for a subroutine's parameters
+        @return a ParseTree that represents a subroutine's parameters
+        """
+        return self.parse('parameterList')
+
+
+    def compileSubroutineBody(self):
+        """
+        Generates a parse tree for a subroutine's body
+        @return a ParseTree that represents a subroutine's body
+        """
+        return self.parse('subroutineBody')
+
+
+    def compileVarDec(self):
+        """
+        Generates a parse tree for a variable declaration
+        @return a ParseTree that represents a variable declaration
+        """
+        if not self.have('keyword', 'var'):
+            return None
+
+        return self.parse('varDec')
+
+
+    def compileStatements(self):
+        """
+        Generates a parse tree for a series of statements
+        @return a ParseTree that represents a series of statements
+        """
+        return self.parse('statements')
+
+
+    def compileLet(self):
+        """
+        Generates a parse tree for a let statement
+        @return a ParseTree that represents a let statement
+        """
+        return self.parse('letStatement')
+
+
+    def compileIf(self):
+        """
+        Generates a parse tree for an if statement
+        @return a ParseTree that represents an if statement
+        """
+        return self.parse('ifStatement')
+
+
+    def compileWhile(self):
+        """
+        Generates a parse tree for a while statement
+        @return a ParseTree that represents a while statement
+        """
+        return self.parse('whileStatement')
+
+
+    def compileDo(self):
+        """
+        Generates a parse tree for a do statement
+        @return a ParseTree that represents a do statement
+        """
+        return self.parse('doStatement')
+
+
+    def compileReturn(self):
+        """
+        Generates a parse tree for a return statement
+        @return a ParseTree that represents a return statement
+        """
+        return self.parse('returnStatement')
+
+
+    def compileExpression(self):
+        """
+        Generates a parse tree for an expression
+        @return a ParseTree that represents an expression
+        """
+        return self.parse('expression')
+
+
+    def compileTerm(self):
+        """
+        Generates a parse tree for an expression term
+        @return a ParseTree that represents an expression term
+        """
+        return self.parse('term')
+
+
+    def compileExpressionList(self):
+        """
+        Generates a parse tree for an expression list
+        @return a ParseTree that represents an expression list
+        """
+        return self.parse('expressionList')
+
+
+    def parse(self, start):
+        """
+        Generates a parse tree for the given nonterminal using an explicit stack
+        @param start The nonterminal to parse
+        @return a ParseTree that represents the nonterminal
+        """
+        tokens = self.tokens
+        count = len(tokens)
+        actions = self.grammar.entry_actions[start]
+        epsilon_actions = self.grammar.epsilon_actions
+        node_types = self.grammar.node_types
+
+        root = ParseTree('', '')
+        parents = [root]
+        stack = [start]
+        position = self.current_token
+
+        while stack:
+            entry = stack.pop()
+
+            if entry is None:
+                parents.pop()
+
+            elif entry.__class__ is str:
+                # Nonterminal: pick the production for the current lookahead
+                if position < count:
+                    token = tokens[position]
+                    token_type = token.getType()
+                    lookahead = (token_type, None) if token_type in WILDCARD_TYPES else (token_type, token.getValue())
+                else:
+                    lookahead = END
+                production = actions[entry].get(lookahead)
+                if production is None:
+                    # A nullable nonterminal steps aside, so the error is reported by whatever
+                    # must come next, just as CompilerParser would report it
+                    production = epsilon_actions.get(entry)
+                if production is None:
+                    self.current_token = position
+                    # At end of input, point at the last token, where the input ran out
+                    culprit = tokens[min(position, count - 1)] if count else None
+                    raise ParseException(f"Expected {describeTerminals(actions[entry])}, got {describeTerminal(lookahead)}", culprit)
+                node_type = node_types.get(entry)
+                if node_type is not None:
+                    tree = ParseTree(node_type, '')
+                    parents[-1].addChild(tree)
+                    parents.append(tree)
+                stack.extend(production)
+
+            else:
+                # Terminal: must match the current token
+                if position >= count:
+                    self.current_token = position
+                    raise ParseException("No more token to parse!", tokens[-1] if count else None)
+                token = tokens[position]
+                expected_type, expected_value = entry
+                if token.getType() != expected_type or (expected_value is not None and token.getValue() != expected_value):
+                    self.current_token = position
+                    raise ParseException(f"Expected {expected_type}:{expected_value}, got {token.getType()}:{token.getValue()}", token)
+                parents[-1].addChild(token)
+                position += 1
+
+        self.current_token = position
+        return root.getChildren()[0]
+
+
+    def current(self):
+        """
+        Return the current token
+        @return the token
+        """
+        if self.current_token < len(self.tokens):
+            return self.tokens[self.current_token]
+        else:
+            # Point at the last token, where the input ran out
+            raise ParseException("No more token to parse!", self.tokens[-1] if self.tokens else None)
+
+
+    def have(self,expectedType,expectedValue):
+        """
+        Check if the current token matches the expected type and value.
+        @return True if a match, False otherwise
+        """
+        try:
+            current = self.current()
+            return current.getType() == expectedType and current.getValue() == expectedValue
+        except ParseException:
+            return False
+
+
+def describeTerminal(terminal):
+    """
+    Describe a grammar terminal the way ParseException messages name tokens
+    @param terminal A (type, value) terminal, where a value of None matches any token of that type
+    @return The description, e.g. "symbol:;", "identifier" or "end of input"
+    """
+    if terminal == END:
+        return "end of input"
+    if terminal[1] is None:
+        return terminal[0]
+    return f"{terminal[0]}:{terminal[1]}"
+
+
+def describeTerminals(terminals):
+    """
+    Describe the terminals a nonterminal could start with, in a stable order
+    @param terminals The terminals
+    @return The description, e.g. "symbol:;" or "one of keyword:int, identifier"
+    """
+    names = sorted(describeTerminal(terminal) for terminal in terminals)
+    if len(names) == 1:
+        return names[0]
+    return "one of " + ", ".join(names)
+
+
+def sameTree(a, b):
+    """
+    Check if two ParseTrees have identical shape, node types and values
+    @param a The first ParseTree
+    @param b The second ParseTree
+    @return True if the trees are identical, False otherwise
+    """
+    pending = [(a, b)]
+    while pending:
+        a, b = pending.pop()
+        if a.getType() != b.getType() or a.getValue() != b.getValue():
+            return False
+        if len(a.getChildren()) != len(b.getChildren()):
+            return False
+        pending.extend(zip(a.getChildren(), b.getChildren()))
+    return True
+
+
+if __name__ == "__main__":
+    import re
+    import timeit
+    from CompilerParser import CompilerParser
+
+    def tokenize(words):
+        """
+        Build tokens from a list of "type:value" strings
+        """
+        return [Token(*word.split(':', 1)) for word in words]
+
+    # Differential check: both engines must build identical trees
+    member = ("keyword:function keyword:int identifier:calc symbol:( keyword:int identifier:x "
+              "symbol:, identifier:Point identifier:p symbol:) symbol:{ "
+              "keyword:var keyword:int identifier:i symbol:, identifier:j symbol:; "
+              "keyword:let identifier:i symbol:= integerConstant:1 symbol:+ symbol:( "
+              "identifier:x symbol:* symbol:- integerConstant:2 symbol:) symbol:; "
+              "keyword:let identifier:a symbol:[ identifier:i symbol:] symbol:= keyword:skip symbol:; "
+              "keyword:if symbol:( symbol:~ identifier:b symbol:) symbol:{ "
+              "keyword:do identifier:p symbol:. identifier:move symbol:( identifier:x symbol:, "
+              "identifier:a symbol:[ identifier:j symbol:] symbol:) symbol:; symbol:} "
+              "keyword:else symbol:{ keyword:do identifier:draw symbol:( symbol:) symbol:; symbol:} "
+              "keyword:while symbol:( identifier:i symbol:< integerConstant:10 symbol:) symbol:{ "
+              "keyword:let identifier:s symbol:= stringConstant:hello symbol:; symbol:} "
+              "keyword:return keyword:this symbol:; symbol:}").split()
+    header = "keyword:class identifier:Main symbol:{ keyword:static keyword:int identifier:a symbol:; " \
+             "keyword:field keyword:boolean identifier:b symbol:, identifier:c symbol:;".split()
+
+    programs = [
+        header + ["symbol:}"],
+        header + member + ["symbol:}"],
+        "keyword:class identifier:Empty symbol:{ symbol:}".split(),
+        "keyword:class identifier:Main symbol:{ keyword:method keyword:void identifier:f symbol:( symbol:) "
+        "symbol:{ keyword:return symbol:; symbol:} symbol:}".split(),
+        # do skip; and let x = skip; as in CompilerParser's demo, and calls nested inside expression lists
+        "keyword:class identifier:Main symbol:{ keyword:function keyword:void identifier:f symbol:( symbol:) symbol:{ "
+        "keyword:do keyword:skip symbol:; keyword:let identifier:x symbol:= keyword:skip symbol:; "
+        "keyword:do identifier:f symbol:( identifier:g symbol:( integerConstant:1 symbol:) symbol:, identifier:a symbol:. "
+        "identifier:h symbol:( identifier:b symbol:, identifier:c symbol:( symbol:) symbol:) symbol:) symbol:; "
+        "keyword:return keyword:skip symbol:; symbol:} symbol:}".split(),
+    ]
+    for words in programs:
+        tokens = tokenize(words)
+        expected = CompilerParser(tokens).compileProgram()
+        actual = TableParser(tokens).compileProgram()
+        if not sameTree(expected, actual):
+            raise Exception(f"Parse trees differ for: {' '.join(words)}")
+
+    # Each grammar rule's entry point must match its compile* counterpart too
+    rules = [
+        ('compileStatements', "keyword:do keyword:skip symbol:; keyword:let identifier:x symbol:= keyword:skip symbol:;"),
+        ('compileDo', "keyword:do keyword:skip symbol:;"),
+        ('compileLet', "keyword:let identifier:x symbol:= keyword:skip symbol:;"),
+        ('compileExpression', "identifier:f symbol:( identifier:g symbol:( integerConstant:1 symbol:, identifier:a symbol:. "
+                              "identifier:h symbol:( identifier:b symbol:[ identifier:i symbol:] symbol:) symbol:) symbol:, "
+                              "symbol:( integerConstant:2 symbol:) symbol:) symbol:+ integerConstant:3"),
+        ('compileTerm', "symbol:- symbol:~ identifier:x"),
+        ('compileExpressionList', "integerConstant:1 symbol:, identifier:f symbol:( symbol:)"),
+        ('compileParameterList', "keyword:int identifier:a symbol:, identifier:Point identifier:p"),
+        ('compileVarDec', "keyword:var identifier:Point identifier:p symbol:, identifier:q symbol:;"),
+        ('compileClassVarDec', "keyword:field keyword:char identifier:c symbol:;"),
+    ]
+    for method, words in rules:
+        tokens = tokenize(words.split())
+        expected = getattr(CompilerParser(tokens), method)()
+        actual = getattr(TableParser(tokens), method)()
+        if not sameTree(expected, actual):
+            raise Exception(f"{method} parse trees differ for: {words}")
+    print(f"{len(programs)} programs and {len(rules)} rules parsed identically by both engines")
+
+    # Errors report where they are in the source file
+    def tokenizeSource(source):
+        """
+        Split a SourceFile into tokens that remember their offsets
+        """
+        tokens = []
+        for match in re.finditer(r'\d+|\w+|\S', source.text):
+            text = match.group()
+            if text.isdigit():
+                token_type = 'integerConstant'
+            elif text in ['class', 'function', 'void', 'int', 'var', 'let', 'return']:
+                token_type = 'keyword'
+            elif text[0].isalpha() or text[0] == '_':
+                token_type = 'identifier'
+            else:
+                token_type = 'symbol'
+            tokens.append(Token(token_type, text, match.start(), source))
+        return tokens
+
+    body = "class Main {\n    function void f() {\n        var int a;\n        let a = 1\n        return;\n    }\n}\n"
+    cases = [
+        # Missing semicolon: reported at the 'return' that follows
+        (SourceFile("Main.jack", body), 5, 9),
+        # Truncated file: reported at the last token
+        (SourceFile("Truncated.jack", body[:body.index("return")]), 4, 17),
+    ]
+    for source, line, column in cases:
+        for engine in [CompilerParser, TableParser]:
+            try:
+                engine(tokenizeSource(source)).compileProgram()
+                raise Exception(f"{engine.__name__} parsed {source.getName()} without error")
+            except ParseException as error:
+                if (error.source, error.line, error.column) != (source.getName(), line, column):
+                    raise Exception(f"{engine.__name__} reported {error.source}:{error.line}:{error.column}, expected {source.getName()}:{line}:{column}")
+                print(error)
+
+    # Benchmark: throughput on a class with many subroutines
+    tokens = tokenize(header + member * 200 + ["symbol:}"])
+    if not sameTree(CompilerParser(tokens).compileProgram(), TableParser(tokens).compileProgram()):
+        raise Exception("Parse trees differ for the benchmark program")
+    runs = 20
+    hand = timeit.timeit(lambda: CompilerParser(tokens).compileProgram(), number=runs)
+    table = timeit.timeit(lambda: TableParser(tokens).compileProgram(), number=runs)
+    rate = lambda seconds: len(tokens) * runs / seconds
+    print(f"CompilerParser: {rate(hand):,.0f} tokens/s")
+    print(f"TableParser:    {rate(table):,.0f} tokens/s")